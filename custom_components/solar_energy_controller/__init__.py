@@ -1,45 +1,53 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
 
 from homeassistant.config_entries import ConfigEntry, ConfigEntryError, ConfigEntryNotReady
-from homeassistant.core import HomeAssistant, Event
+from homeassistant.core import CoreState, HomeAssistant, Event
 from homeassistant.const import EVENT_HOMEASSISTANT_STARTED
 from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.device_registry import DeviceEntryType
 from homeassistant.components.http import StaticPathConfig
 
-from .const import DOMAIN, PLATFORMS
+from .const import (
+    DOMAIN,
+    UNAVAILABLE_STATES,
+    PLATFORMS,
+    VERSION,
+    CONF_PROCESS_VALUE_ENTITY,
+    CONF_SETPOINT_ENTITY,
+    CONF_OUTPUT_ENTITY,
+    CONF_GRID_POWER_ENTITY,
+)
 from .coordinator import SolarEnergyFlowCoordinator
 
 _LOGGER = logging.getLogger(__name__)
 
 type SolarEnergyControllerConfigEntry = ConfigEntry[SolarEnergyFlowCoordinator]
 
+_REQUIRED_ENTITY_NAMES = {
+    CONF_PROCESS_VALUE_ENTITY: "Process Value",
+    CONF_SETPOINT_ENTITY: "Setpoint",
+    CONF_OUTPUT_ENTITY: "Output",
+    CONF_GRID_POWER_ENTITY: "Grid Power",
+}
+
+_FRONTEND_CARDS = ("pid-controller-mini.js", "pid-controller-popup.js")
+
+_RESOURCES = tuple(
+    {"url": f"/{DOMAIN}/frontend/{card}?v={VERSION}", "res_type": "module"}
+    for card in _FRONTEND_CARDS
+)
+_RESOURCE_BASES = frozenset(resource["url"].split("?", 1)[0] for resource in _RESOURCES)
+
 
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     _LOGGER.info("Solar Energy Controller: Initializing integration")
-    
-    version = "1.0.0"
-    try:
-        import json
-        
-        def read_manifest():
-            manifest_path = os.path.join(os.path.dirname(__file__), "manifest.json")
-            if os.path.exists(manifest_path):
-                with open(manifest_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            return None
-        
-        manifest = await hass.async_add_executor_job(read_manifest)
-        if manifest:
-            version = manifest.get("version", version)
-    except Exception:
-        pass
-    
+
     frontend_path = os.path.join(os.path.dirname(__file__), "frontend")
-    if os.path.isdir(frontend_path):
+    if await hass.async_add_executor_job(os.path.isdir, frontend_path):
         await hass.http.async_register_static_paths([
             StaticPathConfig(
                 url_path=f"/{DOMAIN}/frontend",
@@ -51,24 +59,10 @@ async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     else:
         _LOGGER.warning("Solar Energy Controller: Frontend directory not found: %s", frontend_path)
 
-    async def register_resources(_event: Event) -> None:
+    async def register_resources() -> None:
         _LOGGER.info("Attempting to register Lovelace resources for %s", DOMAIN)
 
-        resources = [
-            {
-                "url": f"/{DOMAIN}/frontend/pid-controller-mini.js?v={version}",
-                "res_type": "module",
-            },
-            {
-                "url": f"/{DOMAIN}/frontend/pid-controller-popup.js?v={version}",
-                "res_type": "module",
-            },
-        ]
-
         try:
-            import asyncio
-            await asyncio.sleep(1)
-            
             lovelace_obj = None
             if hasattr(hass, "lovelace"):
                 lovelace_obj = hass.lovelace
@@ -78,7 +72,7 @@ async def async_setup(hass: HomeAssistant, config: dict) -> bool:
                 _LOGGER.warning(
                     "Lovelace not available. Please add cards manually: "
                     "Settings → Dashboards → Resources. URLs: %s",
-                    [r["url"] for r in resources]
+                    [r["url"] for r in _RESOURCES]
                 )
                 return
             
@@ -87,34 +81,36 @@ async def async_setup(hass: HomeAssistant, config: dict) -> bool:
                 _LOGGER.info(
                     "Lovelace is in %s mode. Auto-registration only works in storage mode. "
                     "Please add cards manually: %s",
-                    lovelace_mode, [r["url"] for r in resources]
+                    lovelace_mode, [r["url"] for r in _RESOURCES]
                 )
                 return
             
-            existing_resources = []
+            # async_items() iterates the in-memory resource storage; no I/O involved
+            resources_api = lovelace_obj.resources
+            existing_bases: set[str] = set()
             try:
-                resources_api = lovelace_obj.resources
                 existing_items = resources_api.async_items()
-                existing_resources = [
-                    item.get("url", "") if isinstance(item, dict) else str(item)
+                existing_bases = {
+                    (item.get("url", "") if isinstance(item, dict) else str(item)).split("?", 1)[0]
                     for item in existing_items
                     if item
-                ]
+                }
             except Exception as err:
                 _LOGGER.debug("Could not get existing resources: %s", err)
 
+            if _RESOURCE_BASES <= existing_bases:
+                _LOGGER.debug("All Lovelace resources for %s already registered", DOMAIN)
+                return
+
+            create_item = resources_api.async_create_item
             registered_count = 0
-            for resource in resources:
+            for resource in _RESOURCES:
                 resource_url = resource["url"]
-                url_base = resource_url.split("?")[0]
-                if any(url_base in existing for existing in existing_resources):
-                    _LOGGER.debug("Lovelace resource already exists: %s", url_base)
+                if resource_url.split("?", 1)[0] in existing_bases:
                     continue
 
                 try:
-                    await resources_api.async_create_item(
-                        {"url": resource_url, "res_type": resource["res_type"]}
-                    )
+                    await create_item({"url": resource_url, "res_type": resource["res_type"]})
                     _LOGGER.info(
                         "✓ Registered Lovelace resource: %s (%s)", resource_url, resource["res_type"]
                     )
@@ -133,66 +129,56 @@ async def async_setup(hass: HomeAssistant, config: dict) -> bool:
             _LOGGER.warning(
                 "Error accessing Lovelace resources API: %s. Please add cards manually: "
                 "Settings → Dashboards → Resources. URLs: %s",
-                err, [r["url"] for r in resources]
+                err, [r["url"] for r in _RESOURCES]
             )
 
-    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STARTED, register_resources)
+    async def register_resources_after_start(_event: Event) -> None:
+        # Give Lovelace a moment to finish loading its resource storage
+        await asyncio.sleep(1)
+        await register_resources()
+
+    if hass.state is CoreState.running:
+        # Already started (e.g. integration reload); the STARTED event will not fire again
+        hass.async_create_task(register_resources())
+    else:
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STARTED, register_resources_after_start)
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: SolarEnergyControllerConfigEntry) -> bool:
     """Set up Solar Energy Controller from a config entry."""
-    from .const import (
-        CONF_PROCESS_VALUE_ENTITY,
-        CONF_SETPOINT_ENTITY,
-        CONF_OUTPUT_ENTITY,
-        CONF_GRID_POWER_ENTITY,
-    )
-
     # Validate that all required entities exist and are accessible
     # Check both entry.data and entry.options (entities can be in either)
+    options = entry.options
+    data = entry.data
     required_entities = {
-        CONF_PROCESS_VALUE_ENTITY: entry.options.get(CONF_PROCESS_VALUE_ENTITY) or entry.data.get(CONF_PROCESS_VALUE_ENTITY),
-        CONF_SETPOINT_ENTITY: entry.options.get(CONF_SETPOINT_ENTITY) or entry.data.get(CONF_SETPOINT_ENTITY),
-        CONF_OUTPUT_ENTITY: entry.options.get(CONF_OUTPUT_ENTITY) or entry.data.get(CONF_OUTPUT_ENTITY),
-        CONF_GRID_POWER_ENTITY: entry.options.get(CONF_GRID_POWER_ENTITY) or entry.data.get(CONF_GRID_POWER_ENTITY),
+        key: options.get(key) or data.get(key) for key in _REQUIRED_ENTITY_NAMES
     }
 
     missing_entities = []
     unavailable_entities = []
 
+    get_state = hass.states.get
     for key, entity_id in required_entities.items():
         if not entity_id:
             missing_entities.append(key)
             continue
 
-        state = hass.states.get(entity_id)
+        state = get_state(entity_id)
         if state is None:
             missing_entities.append(key)
-        elif state.state in ("unavailable", "unknown"):
+        elif state.state in UNAVAILABLE_STATES:
             unavailable_entities.append(key)
 
     if missing_entities:
-        entity_names = {
-            CONF_PROCESS_VALUE_ENTITY: "Process Value",
-            CONF_SETPOINT_ENTITY: "Setpoint",
-            CONF_OUTPUT_ENTITY: "Output",
-            CONF_GRID_POWER_ENTITY: "Grid Power",
-        }
-        missing_names = [entity_names[key] for key in missing_entities]
+        missing_names = [_REQUIRED_ENTITY_NAMES[key] for key in missing_entities]
         raise ConfigEntryError(
             f"Required entities not found: {', '.join(missing_names)}. "
             "Please check your configuration and ensure all entities exist."
         )
 
     if unavailable_entities:
-        entity_names = {
-            CONF_PROCESS_VALUE_ENTITY: "Process Value",
-            CONF_SETPOINT_ENTITY: "Setpoint",
-            CONF_OUTPUT_ENTITY: "Output",
-            CONF_GRID_POWER_ENTITY: "Grid Power",
-        }
-        unavailable_names = [entity_names[key] for key in unavailable_entities]
+        unavailable_names = [_REQUIRED_ENTITY_NAMES[key] for key in unavailable_entities]
         raise ConfigEntryNotReady(
             f"Required entities are unavailable: {', '.join(unavailable_names)}. "
             "Please ensure the entities are working and try again."
@@ -223,13 +209,13 @@ async def async_setup_entry(hass: HomeAssistant, entry: SolarEnergyControllerCon
 
 async def _update_listener(hass: HomeAssistant, entry: SolarEnergyControllerConfigEntry) -> None:
     coordinator = entry.runtime_data
-    new_options = dict(entry.options)
     old_options = coordinator.options_cache
 
-    if old_options == new_options:
+    if old_options == entry.options:
         _LOGGER.debug("Options unchanged for %s; skipping handling", entry.entry_id)
         return
 
+    new_options = dict(entry.options)
     coordinator.options_cache = new_options
 
     if coordinator.options_require_reload(old_options, new_options):
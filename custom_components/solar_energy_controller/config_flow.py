@@ -1,15 +1,18 @@
 from __future__ import annotations
 
 import logging
+from typing import Any, Mapping
 
 import voluptuous as vol
 from homeassistant import config_entries
+from homeassistant.core import HomeAssistant
 from homeassistant.helpers import selector
 
 _LOGGER = logging.getLogger(__name__)
 
 from .const import (
     DOMAIN,
+    UNAVAILABLE_STATES,
     CONF_NAME,
     CONF_PROCESS_VALUE_ENTITY,
     CONF_SETPOINT_ENTITY,
@@ -76,6 +79,41 @@ _SETPOINT_DOMAINS = {"number", "input_number"}
 _OUTPUT_DOMAINS = {"number", "input_number"}
 _GRID_DOMAINS = {"sensor", "number", "input_number"}
 
+_ENTITY_DOMAIN_CHECKS = (
+    (CONF_PROCESS_VALUE_ENTITY, _PV_DOMAINS, "invalid_pv_domain"),
+    (CONF_SETPOINT_ENTITY, _SETPOINT_DOMAINS, "invalid_setpoint_domain"),
+    (CONF_OUTPUT_ENTITY, _OUTPUT_DOMAINS, "invalid_output_domain"),
+    (CONF_GRID_POWER_ENTITY, _GRID_DOMAINS, "invalid_grid_domain"),
+)
+_ENTITY_KEYS = tuple(key for key, _, _ in _ENTITY_DOMAIN_CHECKS)
+
+
+# Validators are built once and shared by the config and options schemas
+_PV_SELECTOR = selector.EntitySelector(selector.EntitySelectorConfig(domain=list(_PV_DOMAINS)))
+_SETPOINT_SELECTOR = selector.EntitySelector(selector.EntitySelectorConfig(domain=list(_SETPOINT_DOMAINS)))
+_OUTPUT_SELECTOR = selector.EntitySelector(selector.EntitySelectorConfig(domain=list(_OUTPUT_DOMAINS)))
+_GRID_SELECTOR = selector.EntitySelector(selector.EntitySelectorConfig(domain=list(_GRID_DOMAINS)))
+_FLOAT = vol.Coerce(float)
+_PID_MODE_VALIDATOR = vol.In([PID_MODE_DIRECT, PID_MODE_REVERSE])
+_UPDATE_INTERVAL_VALIDATOR = vol.All(vol.Coerce(int), vol.Range(min=1))
+_RANGE_KEYS = (CONF_PV_MIN, CONF_PV_MAX, CONF_SP_MIN, CONF_SP_MAX, CONF_GRID_MIN, CONF_GRID_MAX)
+
+_USER_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_NAME): str,
+        vol.Required(CONF_PROCESS_VALUE_ENTITY): _PV_SELECTOR,
+        vol.Required(CONF_SETPOINT_ENTITY): _SETPOINT_SELECTOR,
+        vol.Required(CONF_OUTPUT_ENTITY): _OUTPUT_SELECTOR,
+        vol.Required(CONF_GRID_POWER_ENTITY): _GRID_SELECTOR,
+        vol.Required(CONF_PV_MIN, default=DEFAULT_PV_MIN): _FLOAT,
+        vol.Required(CONF_PV_MAX, default=DEFAULT_PV_MAX): _FLOAT,
+        vol.Required(CONF_SP_MIN, default=DEFAULT_SP_MIN): _FLOAT,
+        vol.Required(CONF_SP_MAX, default=DEFAULT_SP_MAX): _FLOAT,
+        vol.Required(CONF_GRID_MIN, default=DEFAULT_GRID_MIN): _FLOAT,
+        vol.Required(CONF_GRID_MAX, default=DEFAULT_GRID_MAX): _FLOAT,
+    }
+)
+
 
 def _extract_domain(entity_id: str | None) -> str | None:
     if not entity_id or "." not in entity_id:
@@ -83,25 +121,41 @@ def _extract_domain(entity_id: str | None) -> str | None:
     return entity_id.split(".", 1)[0]
 
 
+def _validate_entity_domains(values: Mapping[str, Any], errors: dict[str, str]) -> None:
+    """Record an error for every entity field outside its allowed domains."""
+    for key, domains, error in _ENTITY_DOMAIN_CHECKS:
+        if _extract_domain(values[key]) not in domains:
+            errors[key] = error
+
+
+def _validate_entity_states(hass: HomeAssistant, values: Mapping[str, Any], errors: dict[str, str]) -> None:
+    """Test connection: verify all entities exist and are accessible."""
+    get_state = hass.states.get
+    try:
+        for key in _ENTITY_KEYS:
+            entity_id = values.get(key)
+            # Check if entity IDs are provided
+            if not entity_id:
+                errors[key] = "entity_not_found"
+                continue
+            state = get_state(entity_id)
+            if state is None:
+                errors[key] = "entity_not_found"
+            elif state.state in UNAVAILABLE_STATES:
+                errors[key] = "entity_unavailable"
+    except Exception as e:
+        # Log the actual exception for debugging
+        _LOGGER.exception("Error validating entities: %s", e)
+        errors["base"] = "connection_failed"
+
+
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
 
     async def async_step_user(self, user_input=None):
         errors: dict[str, str] = {}
         if user_input is not None:
-            pv_domain = _extract_domain(user_input[CONF_PROCESS_VALUE_ENTITY])
-            sp_domain = _extract_domain(user_input[CONF_SETPOINT_ENTITY])
-            output_domain = _extract_domain(user_input[CONF_OUTPUT_ENTITY])
-            grid_domain = _extract_domain(user_input[CONF_GRID_POWER_ENTITY])
-
-            if pv_domain not in _PV_DOMAINS:
-                errors[CONF_PROCESS_VALUE_ENTITY] = "invalid_pv_domain"
-            if sp_domain not in _SETPOINT_DOMAINS:
-                errors[CONF_SETPOINT_ENTITY] = "invalid_setpoint_domain"
-            if output_domain not in _OUTPUT_DOMAINS:
-                errors[CONF_OUTPUT_ENTITY] = "invalid_output_domain"
-            if grid_domain not in _GRID_DOMAINS:
-                errors[CONF_GRID_POWER_ENTITY] = "invalid_grid_domain"
+            _validate_entity_domains(user_input, errors)
 
             range_valid = True
             try:
@@ -121,63 +175,10 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 errors["base"] = "invalid_range"
 
             if not errors:
-                # Test connection: verify all entities exist and are accessible
-                try:
-                    pv_entity = user_input.get(CONF_PROCESS_VALUE_ENTITY)
-                    sp_entity = user_input.get(CONF_SETPOINT_ENTITY)
-                    output_entity = user_input.get(CONF_OUTPUT_ENTITY)
-                    grid_entity = user_input.get(CONF_GRID_POWER_ENTITY)
-
-                    # Check if entity IDs are provided
-                    if not pv_entity:
-                        errors[CONF_PROCESS_VALUE_ENTITY] = "entity_not_found"
-                    else:
-                        pv_state = self.hass.states.get(pv_entity)
-                        if pv_state is None:
-                            errors[CONF_PROCESS_VALUE_ENTITY] = "entity_not_found"
-                        elif pv_state.state in ("unavailable", "unknown"):
-                            errors[CONF_PROCESS_VALUE_ENTITY] = "entity_unavailable"
-
-                    if not sp_entity:
-                        errors[CONF_SETPOINT_ENTITY] = "entity_not_found"
-                    else:
-                        sp_state = self.hass.states.get(sp_entity)
-                        if sp_state is None:
-                            errors[CONF_SETPOINT_ENTITY] = "entity_not_found"
-                        elif sp_state.state in ("unavailable", "unknown"):
-                            errors[CONF_SETPOINT_ENTITY] = "entity_unavailable"
-
-                    if not output_entity:
-                        errors[CONF_OUTPUT_ENTITY] = "entity_not_found"
-                    else:
-                        output_state = self.hass.states.get(output_entity)
-                        if output_state is None:
-                            errors[CONF_OUTPUT_ENTITY] = "entity_not_found"
-                        elif output_state.state in ("unavailable", "unknown"):
-                            errors[CONF_OUTPUT_ENTITY] = "entity_unavailable"
-
-                    if not grid_entity:
-                        errors[CONF_GRID_POWER_ENTITY] = "entity_not_found"
-                    else:
-                        grid_state = self.hass.states.get(grid_entity)
-                        if grid_state is None:
-                            errors[CONF_GRID_POWER_ENTITY] = "entity_not_found"
-                        elif grid_state.state in ("unavailable", "unknown"):
-                            errors[CONF_GRID_POWER_ENTITY] = "entity_unavailable"
-                except KeyError as e:
-                    # Missing required field
-                    missing_key = str(e).strip("'")
-                    if missing_key in (CONF_PROCESS_VALUE_ENTITY, CONF_SETPOINT_ENTITY, CONF_OUTPUT_ENTITY, CONF_GRID_POWER_ENTITY):
-                        errors[missing_key] = "entity_not_found"
-                    else:
-                        errors["base"] = "connection_failed"
-                except Exception as e:
-                    # Log the actual exception for debugging
-                    _LOGGER.exception("Error validating entities: %s", e)
-                    errors["base"] = "connection_failed"
+                _validate_entity_states(self.hass, user_input, errors)
 
             if errors:
-                return self.async_show_form(step_id="user", data_schema=self._build_user_schema(), errors=errors)
+                return self.async_show_form(step_id="user", data_schema=_USER_SCHEMA, errors=errors)
 
             unique_id = (
                 f"{user_input[CONF_PROCESS_VALUE_ENTITY]}::{user_input[CONF_SETPOINT_ENTITY]}::{user_input[CONF_OUTPUT_ENTITY]}"
@@ -187,38 +188,12 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             name = user_input.pop(CONF_NAME)
             return self.async_create_entry(title=name, data=user_input)
 
-        return self.async_show_form(step_id="user", data_schema=self._build_user_schema(), errors=errors)
+        return self.async_show_form(step_id="user", data_schema=_USER_SCHEMA, errors=errors)
 
     @staticmethod
     def async_get_options_flow(config_entry: config_entries.ConfigEntry):
         return SolarEnergyFlowOptionsFlowHandler(config_entry)
 
-    @staticmethod
-    def _build_user_schema() -> vol.Schema:
-        return vol.Schema(
-            {
-                vol.Required(CONF_NAME): str,
-                vol.Required(CONF_PROCESS_VALUE_ENTITY): selector.EntitySelector(
-                    selector.EntitySelectorConfig(domain=list(_PV_DOMAINS))
-                ),
-                vol.Required(CONF_SETPOINT_ENTITY): selector.EntitySelector(
-                    selector.EntitySelectorConfig(domain=list(_SETPOINT_DOMAINS))
-                ),
-                vol.Required(CONF_OUTPUT_ENTITY): selector.EntitySelector(
-                    selector.EntitySelectorConfig(domain=list(_OUTPUT_DOMAINS))
-                ),
-                vol.Required(CONF_GRID_POWER_ENTITY): selector.EntitySelector(
-                    selector.EntitySelectorConfig(domain=list(_GRID_DOMAINS))
-                ),
-                vol.Required(CONF_PV_MIN, default=DEFAULT_PV_MIN): vol.Coerce(float),
-                vol.Required(CONF_PV_MAX, default=DEFAULT_PV_MAX): vol.Coerce(float),
-                vol.Required(CONF_SP_MIN, default=DEFAULT_SP_MIN): vol.Coerce(float),
-                vol.Required(CONF_SP_MAX, default=DEFAULT_SP_MAX): vol.Coerce(float),
-                vol.Required(CONF_GRID_MIN, default=DEFAULT_GRID_MIN): vol.Coerce(float),
-                vol.Required(CONF_GRID_MAX, default=DEFAULT_GRID_MAX): vol.Coerce(float),
-            }
-        )
-
 
 class SolarEnergyFlowOptionsFlowHandler(config_entries.OptionsFlow):
     """Options flow for wiring and PID behavior shown when user clicks Configure."""
@@ -252,42 +227,29 @@ class SolarEnergyFlowOptionsFlowHandler(config_entries.OptionsFlow):
 
     @staticmethod
     def _build_schema(defaults: dict) -> vol.Schema:
-        return vol.Schema(
-            {
-                vol.Required(CONF_PROCESS_VALUE_ENTITY, default=defaults[CONF_PROCESS_VALUE_ENTITY]): selector.EntitySelector(
-                    selector.EntitySelectorConfig(domain=list(_PV_DOMAINS))
-                ),
-                vol.Required(CONF_SETPOINT_ENTITY, default=defaults[CONF_SETPOINT_ENTITY]): selector.EntitySelector(
-                    selector.EntitySelectorConfig(domain=list(_SETPOINT_DOMAINS))
-                ),
-                vol.Required(CONF_OUTPUT_ENTITY, default=defaults[CONF_OUTPUT_ENTITY]): selector.EntitySelector(
-                    selector.EntitySelectorConfig(domain=list(_OUTPUT_DOMAINS))
-                ),
-                vol.Required(CONF_GRID_POWER_ENTITY, default=defaults[CONF_GRID_POWER_ENTITY]): selector.EntitySelector(
-                    selector.EntitySelectorConfig(domain=list(_GRID_DOMAINS))
-                ),
-                vol.Optional(CONF_INVERT_PV, default=defaults.get(CONF_INVERT_PV, DEFAULT_INVERT_PV)): bool,
-                vol.Optional(CONF_INVERT_SP, default=defaults.get(CONF_INVERT_SP, DEFAULT_INVERT_SP)): bool,
-                vol.Optional(
-                    CONF_GRID_POWER_INVERT,
-                    default=defaults.get(CONF_GRID_POWER_INVERT, DEFAULT_GRID_POWER_INVERT),
-                ): bool,
-                vol.Optional(
-                    CONF_PID_MODE,
-                    default=defaults.get(CONF_PID_MODE, DEFAULT_PID_MODE),
-                ): vol.In([PID_MODE_DIRECT, PID_MODE_REVERSE]),
-                vol.Optional(
-                    CONF_UPDATE_INTERVAL,
-                    default=defaults.get(CONF_UPDATE_INTERVAL, DEFAULT_UPDATE_INTERVAL),
-                ): vol.All(vol.Coerce(int), vol.Range(min=1)),
-                vol.Required(CONF_PV_MIN, default=defaults[CONF_PV_MIN]): vol.Coerce(float),
-                vol.Required(CONF_PV_MAX, default=defaults[CONF_PV_MAX]): vol.Coerce(float),
-                vol.Required(CONF_SP_MIN, default=defaults[CONF_SP_MIN]): vol.Coerce(float),
-                vol.Required(CONF_SP_MAX, default=defaults[CONF_SP_MAX]): vol.Coerce(float),
-                vol.Required(CONF_GRID_MIN, default=defaults[CONF_GRID_MIN]): vol.Coerce(float),
-                vol.Required(CONF_GRID_MAX, default=defaults[CONF_GRID_MAX]): vol.Coerce(float),
-            }
-        )
+        schema = {
+            vol.Required(CONF_PROCESS_VALUE_ENTITY, default=defaults[CONF_PROCESS_VALUE_ENTITY]): _PV_SELECTOR,
+            vol.Required(CONF_SETPOINT_ENTITY, default=defaults[CONF_SETPOINT_ENTITY]): _SETPOINT_SELECTOR,
+            vol.Required(CONF_OUTPUT_ENTITY, default=defaults[CONF_OUTPUT_ENTITY]): _OUTPUT_SELECTOR,
+            vol.Required(CONF_GRID_POWER_ENTITY, default=defaults[CONF_GRID_POWER_ENTITY]): _GRID_SELECTOR,
+            vol.Optional(CONF_INVERT_PV, default=defaults.get(CONF_INVERT_PV, DEFAULT_INVERT_PV)): bool,
+            vol.Optional(CONF_INVERT_SP, default=defaults.get(CONF_INVERT_SP, DEFAULT_INVERT_SP)): bool,
+            vol.Optional(
+                CONF_GRID_POWER_INVERT,
+                default=defaults.get(CONF_GRID_POWER_INVERT, DEFAULT_GRID_POWER_INVERT),
+            ): bool,
+            vol.Optional(
+                CONF_PID_MODE,
+                default=defaults.get(CONF_PID_MODE, DEFAULT_PID_MODE),
+            ): _PID_MODE_VALIDATOR,
+            vol.Optional(
+                CONF_UPDATE_INTERVAL,
+                default=defaults.get(CONF_UPDATE_INTERVAL, DEFAULT_UPDATE_INTERVAL),
+            ): _UPDATE_INTERVAL_VALIDATOR,
+        }
+        for key in _RANGE_KEYS:
+            schema[vol.Required(key, default=defaults[key])] = _FLOAT
+        return vol.Schema(schema)
 
     async def async_step_init(self, user_input=None):
         o = self._config_entry.options
@@ -368,19 +330,7 @@ class SolarEnergyFlowOptionsFlowHandler(config_entries.OptionsFlow):
                 CONF_GRID_MAX: user_input.get(CONF_GRID_MAX, defaults[CONF_GRID_MAX]),
             }
 
-            pv_domain = _extract_domain(cleaned[CONF_PROCESS_VALUE_ENTITY])
-            sp_domain = _extract_domain(cleaned[CONF_SETPOINT_ENTITY])
-            output_domain = _extract_domain(cleaned[CONF_OUTPUT_ENTITY])
-            grid_domain = _extract_domain(cleaned[CONF_GRID_POWER_ENTITY])
-
-            if pv_domain not in _PV_DOMAINS:
-                errors[CONF_PROCESS_VALUE_ENTITY] = "invalid_pv_domain"
-            if sp_domain not in _SETPOINT_DOMAINS:
-                errors[CONF_SETPOINT_ENTITY] = "invalid_setpoint_domain"
-            if output_domain not in _OUTPUT_DOMAINS:
-                errors[CONF_OUTPUT_ENTITY] = "invalid_output_domain"
-            if grid_domain not in _GRID_DOMAINS:
-                errors[CONF_GRID_POWER_ENTITY] = "invalid_grid_domain"
+            _validate_entity_domains(cleaned, errors)
 
             max_output_step = preserved.get(CONF_MAX_OUTPUT_STEP, DEFAULT_MAX_OUTPUT_STEP)
             output_epsilon = preserved.get(CONF_OUTPUT_EPSILON, DEFAULT_OUTPUT_EPSILON)
@@ -411,60 +361,7 @@ class SolarEnergyFlowOptionsFlowHandler(config_entries.OptionsFlow):
                     errors["base"] = "invalid_grid_range"
 
             if not errors:
-                # Test connection: verify all entities exist and are accessible
-                try:
-                    pv_entity = cleaned.get(CONF_PROCESS_VALUE_ENTITY)
-                    sp_entity = cleaned.get(CONF_SETPOINT_ENTITY)
-                    output_entity = cleaned.get(CONF_OUTPUT_ENTITY)
-                    grid_entity = cleaned.get(CONF_GRID_POWER_ENTITY)
-
-                    # Check if entity IDs are provided
-                    if not pv_entity:
-                        errors[CONF_PROCESS_VALUE_ENTITY] = "entity_not_found"
-                    else:
-                        pv_state = self.hass.states.get(pv_entity)
-                        if pv_state is None:
-                            errors[CONF_PROCESS_VALUE_ENTITY] = "entity_not_found"
-                        elif pv_state.state in ("unavailable", "unknown"):
-                            errors[CONF_PROCESS_VALUE_ENTITY] = "entity_unavailable"
-
-                    if not sp_entity:
-                        errors[CONF_SETPOINT_ENTITY] = "entity_not_found"
-                    else:
-                        sp_state = self.hass.states.get(sp_entity)
-                        if sp_state is None:
-                            errors[CONF_SETPOINT_ENTITY] = "entity_not_found"
-                        elif sp_state.state in ("unavailable", "unknown"):
-                            errors[CONF_SETPOINT_ENTITY] = "entity_unavailable"
-
-                    if not output_entity:
-                        errors[CONF_OUTPUT_ENTITY] = "entity_not_found"
-                    else:
-                        output_state = self.hass.states.get(output_entity)
-                        if output_state is None:
-                            errors[CONF_OUTPUT_ENTITY] = "entity_not_found"
-                        elif output_state.state in ("unavailable", "unknown"):
-                            errors[CONF_OUTPUT_ENTITY] = "entity_unavailable"
-
-                    if not grid_entity:
-                        errors[CONF_GRID_POWER_ENTITY] = "entity_not_found"
-                    else:
-                        grid_state = self.hass.states.get(grid_entity)
-                        if grid_state is None:
-                            errors[CONF_GRID_POWER_ENTITY] = "entity_not_found"
-                        elif grid_state.state in ("unavailable", "unknown"):
-                            errors[CONF_GRID_POWER_ENTITY] = "entity_unavailable"
-                except KeyError as e:
-                    # Missing required field
-                    missing_key = str(e).strip("'")
-                    if missing_key in (CONF_PROCESS_VALUE_ENTITY, CONF_SETPOINT_ENTITY, CONF_OUTPUT_ENTITY, CONF_GRID_POWER_ENTITY):
-                        errors[missing_key] = "entity_not_found"
-                    else:
-                        errors["base"] = "connection_failed"
-                except Exception as e:
-                    # Log the actual exception for debugging
-                    _LOGGER.exception("Error validating entities: %s", e)
-                    errors["base"] = "connection_failed"
+                _validate_entity_states(self.hass, cleaned, errors)
 
             if errors:
                 return self.async_show_form(
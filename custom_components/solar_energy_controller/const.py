@@ -1,5 +1,10 @@
+from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
+
 DOMAIN = "solar_energy_controller"
 
+# Keep in sync with "version" in manifest.json
+VERSION = "1.0.0"
+
 CONF_PROCESS_VALUE_ENTITY = "process_value_entity"
 CONF_SETPOINT_ENTITY = "setpoint_entity"
 CONF_OUTPUT_ENTITY = "output_entity"
@@ -82,4 +87,7 @@ RUNTIME_MODE_MANUAL_SP = "MANUAL SP"
 RUNTIME_MODE_HOLD = "HOLD"
 RUNTIME_MODE_MANUAL_OUT = "MANUAL OUT"
 
+# Entity states that mean no usable value is available
+UNAVAILABLE_STATES = frozenset({STATE_UNAVAILABLE, STATE_UNKNOWN})
+
 PLATFORMS = ["sensor", "switch", "number", "select"]
@@ -3,6 +3,7 @@ from __future__ import annotations
 import asyncio
 import logging
 import math
+import time
 from dataclasses import dataclass
 from datetime import timedelta
 from typing import Mapping, Any, Tuple
@@ -14,6 +15,7 @@ from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
 from .const import (
     DOMAIN,
+    UNAVAILABLE_STATES,
     CONF_PROCESS_VALUE_ENTITY,
     CONF_SETPOINT_ENTITY,
     CONF_OUTPUT_ENTITY,
@@ -93,6 +95,20 @@ from .pid import PID, PIDConfig, PIDStepResult
 _LOGGER = logging.getLogger(__name__)
 
 _OUTPUT_DOMAINS = {"number", "input_number"}
+_RUNTIME_MODES = frozenset(
+    {RUNTIME_MODE_AUTO_SP, RUNTIME_MODE_MANUAL_SP, RUNTIME_MODE_HOLD, RUNTIME_MODE_MANUAL_OUT}
+)
+
+# Options that change entity wiring and therefore require an entry reload
+_WIRING_KEYS = (
+    CONF_PROCESS_VALUE_ENTITY,
+    CONF_SETPOINT_ENTITY,
+    CONF_OUTPUT_ENTITY,
+    CONF_GRID_POWER_ENTITY,
+    CONF_INVERT_PV,
+    CONF_INVERT_SP,
+    CONF_GRID_POWER_INVERT,
+)
 
 
 @dataclass
@@ -191,6 +207,10 @@ class OutputWriteResult:
     write_failed: bool
 
 
+def _state_available(state) -> bool:
+    return state is not None and state.state not in UNAVAILABLE_STATES
+
+
 def _state_to_float(state, entity_id: str | None = None) -> float | None:
     if state is None:
         return None
@@ -235,6 +255,11 @@ def _get_update_interval_seconds_from_options(options: Mapping[str, Any]) -> int
 
 
 def _coerce_float(value, default: float) -> float:
+    # Options usually already hold floats; skip the float() call for them
+    if value.__class__ is float:
+        return value
+    if isinstance(value, int):
+        return float(value)
     try:
         return float(value)
     except (TypeError, ValueError):
@@ -305,7 +330,7 @@ def _get_limiter_type(entry: ConfigEntry) -> str:
     return DEFAULT_GRID_LIMITER_TYPE
 
 
-async def _set_output(hass: HomeAssistant, entity_id: str, value: float) -> bool:
+async def _set_output(hass: HomeAssistant, entity_id: str, value: float, state=None) -> bool:
     value = round(value, 1)
     domain = _get_domain(entity_id)
 
@@ -313,8 +338,9 @@ async def _set_output(hass: HomeAssistant, entity_id: str, value: float) -> bool
         _LOGGER.warning("Unsupported output entity domain '%s' for %s. Use number.* or input_number.*", domain, entity_id)
         return False
 
-    # Get entity state to check for min/max limits
-    state = hass.states.get(entity_id)
+    # Get entity state to check for min/max limits (reuse the caller's read when given)
+    if state is None:
+        state = hass.states.get(entity_id)
     if state and hasattr(state, "attributes"):
         entity_min = state.attributes.get("min", None)
         entity_max = state.attributes.get("max", None)
@@ -347,6 +373,12 @@ class SolarEnergyFlowCoordinator(DataUpdateCoordinator[FlowState]):
         self.entry = entry
         self.options_cache: dict[str, Any] = dict(entry.options)
         self._runtime_mode = entry.options.get(CONF_RUNTIME_MODE, DEFAULT_RUNTIME_MODE)
+        # Wiring changes reload the entry (see options_require_reload), so the
+        # entity ids are fixed for the lifetime of this coordinator.
+        self._pv_entity_id = _get_entity_id(entry, CONF_PROCESS_VALUE_ENTITY)
+        self._sp_entity_id = _get_entity_id(entry, CONF_SETPOINT_ENTITY)
+        self._grid_entity_id = _get_entity_id(entry, CONF_GRID_POWER_ENTITY)
+        self._output_entity_id = _get_entity_id(entry, CONF_OUTPUT_ENTITY)
 
         interval = _get_update_interval_seconds(entry)
         super().__init__(
@@ -398,8 +430,13 @@ class SolarEnergyFlowCoordinator(DataUpdateCoordinator[FlowState]):
 
     def _get_normal_setpoint_value(self) -> float | None:
         """Return the current external setpoint with inversion applied (no limiter)."""
-        sp_ent = _get_entity_id(self.entry, CONF_SETPOINT_ENTITY)
-        sp = _state_to_float(self.hass.states.get(sp_ent), sp_ent) if sp_ent else None
+        sp_ent = self._sp_entity_id
+        if not sp_ent:
+            return None
+        return self._setpoint_from_state(self.hass.states.get(sp_ent))
+
+    def _setpoint_from_state(self, sp_state) -> float | None:
+        sp = _state_to_float(sp_state, self._sp_entity_id)
         if sp is not None and self.entry.options.get(CONF_INVERT_SP, DEFAULT_INVERT_SP):
             sp = -sp
         return sp
@@ -420,8 +457,10 @@ class SolarEnergyFlowCoordinator(DataUpdateCoordinator[FlowState]):
         default_min: float,
         default_max: float,
     ) -> tuple[float, float]:
-        min_raw = self.entry.options.get(min_key, self.entry.data.get(min_key, default_min))
-        max_raw = self.entry.options.get(max_key, self.entry.data.get(max_key, default_max))
+        options = self.entry.options
+        data = self.entry.data
+        min_raw = options.get(min_key, data.get(min_key, default_min))
+        max_raw = options.get(max_key, data.get(max_key, default_max))
         return _range_or_default(min_raw, max_raw, default_min, default_max)
 
     @staticmethod
@@ -446,18 +485,14 @@ class SolarEnergyFlowCoordinator(DataUpdateCoordinator[FlowState]):
         return deadband_raw * 100.0 / span
 
     def _build_runtime_options(self) -> RuntimeOptions:
-        enabled = self.entry.options.get(CONF_ENABLED, DEFAULT_ENABLED)
-        min_output, max_output = _get_pid_limits_from_options(self.entry.options)
+        options = self.entry.options
+        enabled = options.get(CONF_ENABLED, DEFAULT_ENABLED)
+        min_output, max_output = _get_pid_limits_from_options(options)
         pv_min, pv_max = self._get_range_value(CONF_PV_MIN, CONF_PV_MAX, DEFAULT_PV_MIN, DEFAULT_PV_MAX)
         sp_min, sp_max = self._get_range_value(CONF_SP_MIN, CONF_SP_MAX, DEFAULT_SP_MIN, DEFAULT_SP_MAX)
         grid_min, grid_max = self._get_range_value(CONF_GRID_MIN, CONF_GRID_MAX, DEFAULT_GRID_MIN, DEFAULT_GRID_MAX)
         runtime_mode = self._runtime_mode
-        if runtime_mode not in (
-            RUNTIME_MODE_AUTO_SP,
-            RUNTIME_MODE_MANUAL_SP,
-            RUNTIME_MODE_HOLD,
-            RUNTIME_MODE_MANUAL_OUT,
-        ):
+        if runtime_mode not in _RUNTIME_MODES:
             runtime_mode = DEFAULT_RUNTIME_MODE
         if runtime_mode != self._runtime_mode:
             self._runtime_mode = runtime_mode
@@ -472,70 +507,71 @@ class SolarEnergyFlowCoordinator(DataUpdateCoordinator[FlowState]):
             sp_max=sp_max,
             grid_min=grid_min,
             grid_max=grid_max,
-            invert_pv=self.entry.options.get(CONF_INVERT_PV, DEFAULT_INVERT_PV),
-            grid_power_invert=self.entry.options.get(CONF_GRID_POWER_INVERT, DEFAULT_GRID_POWER_INVERT),
-            limiter_enabled=self.entry.options.get(CONF_GRID_LIMITER_ENABLED, DEFAULT_GRID_LIMITER_ENABLED),
+            invert_pv=options.get(CONF_INVERT_PV, DEFAULT_INVERT_PV),
+            grid_power_invert=options.get(CONF_GRID_POWER_INVERT, DEFAULT_GRID_POWER_INVERT),
+            limiter_enabled=options.get(CONF_GRID_LIMITER_ENABLED, DEFAULT_GRID_LIMITER_ENABLED),
             limiter_type=_get_limiter_type(self.entry),
             limiter_limit_w=max(
                 0.0,
                 _coerce_float(
-                    self.entry.options.get(CONF_GRID_LIMITER_LIMIT_W, DEFAULT_GRID_LIMITER_LIMIT_W),
+                    options.get(CONF_GRID_LIMITER_LIMIT_W, DEFAULT_GRID_LIMITER_LIMIT_W),
                     DEFAULT_GRID_LIMITER_LIMIT_W,
                 ),
             ),
             limiter_deadband_w=max(
                 0.0,
                 _coerce_float(
-                    self.entry.options.get(CONF_GRID_LIMITER_DEADBAND_W, DEFAULT_GRID_LIMITER_DEADBAND_W),
+                    options.get(CONF_GRID_LIMITER_DEADBAND_W, DEFAULT_GRID_LIMITER_DEADBAND_W),
                     DEFAULT_GRID_LIMITER_DEADBAND_W,
                 ),
             ),
-            rate_limiter_enabled=self.entry.options.get(CONF_RATE_LIMITER_ENABLED, DEFAULT_RATE_LIMITER_ENABLED),
+            rate_limiter_enabled=options.get(CONF_RATE_LIMITER_ENABLED, DEFAULT_RATE_LIMITER_ENABLED),
             rate_limit=max(
-                0.0, _coerce_float(self.entry.options.get(CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT), DEFAULT_RATE_LIMIT)
+                0.0, _coerce_float(options.get(CONF_RATE_LIMIT, DEFAULT_RATE_LIMIT), DEFAULT_RATE_LIMIT)
             ),
             pid_deadband=max(
-                0.0, _coerce_float(self.entry.options.get(CONF_PID_DEADBAND, DEFAULT_PID_DEADBAND), DEFAULT_PID_DEADBAND)
+                0.0, _coerce_float(options.get(CONF_PID_DEADBAND, DEFAULT_PID_DEADBAND), DEFAULT_PID_DEADBAND)
             ),
             pid_mode=_get_pid_mode(self.entry),
             runtime_mode=runtime_mode,
             max_output_step=max(
                 0.0,
                 _coerce_float(
-                    self.entry.options.get(CONF_MAX_OUTPUT_STEP, DEFAULT_MAX_OUTPUT_STEP),
+                    options.get(CONF_MAX_OUTPUT_STEP, DEFAULT_MAX_OUTPUT_STEP),
                     DEFAULT_MAX_OUTPUT_STEP,
                 ),
             ),
             output_epsilon=max(
                 0.0,
                 _coerce_float(
-                    self.entry.options.get(CONF_OUTPUT_EPSILON, DEFAULT_OUTPUT_EPSILON),
+                    options.get(CONF_OUTPUT_EPSILON, DEFAULT_OUTPUT_EPSILON),
                     DEFAULT_OUTPUT_EPSILON,
                 ),
             ),
         )
 
     def _read_inputs(self, options: RuntimeOptions) -> InputValues:
-        pv_ent = _get_entity_id(self.entry, CONF_PROCESS_VALUE_ENTITY)
-        grid_ent = _get_entity_id(self.entry, CONF_GRID_POWER_ENTITY)
+        pv_ent = self._pv_entity_id
+        grid_ent = self._grid_entity_id
 
+        # Only parse states that are available; unavailable/unknown never convert
         pv_state = self.hass.states.get(pv_ent) if pv_ent else None
-        pv = _state_to_float(pv_state, pv_ent) if pv_ent else None
-        pv_available = pv_state is not None and pv_state.state not in ("unavailable", "unknown")
+        pv_available = _state_available(pv_state)
+        pv = _state_to_float(pv_state, pv_ent) if pv_available else None
         
         grid_state = self.hass.states.get(grid_ent) if grid_ent else None
-        grid_power = _state_to_float(grid_state, grid_ent) if grid_ent else None
-        grid_available = grid_state is not None and grid_state.state not in ("unavailable", "unknown")
+        grid_available = _state_available(grid_state)
+        grid_power = _state_to_float(grid_state, grid_ent) if grid_available else None
 
         if pv is not None and options.invert_pv:
             pv = -pv
         if grid_power is not None and options.grid_power_invert:
             grid_power = -grid_power
 
-        sp = self._get_normal_setpoint_value()
-        sp_ent = _get_entity_id(self.entry, CONF_SETPOINT_ENTITY)
+        sp_ent = self._sp_entity_id
         sp_state = self.hass.states.get(sp_ent) if sp_ent else None
-        sp_available = sp_state is not None and sp_state.state not in ("unavailable", "unknown")
+        sp_available = _state_available(sp_state)
+        sp = self._setpoint_from_state(sp_state) if sp_available else None
 
         # Log PV availability changes
         if not pv_available:
@@ -749,18 +785,18 @@ class SolarEnergyFlowCoordinator(DataUpdateCoordinator[FlowState]):
         if data_runtime_mode:
             return data_runtime_mode
         runtime_mode = self._runtime_mode or self.entry.options.get(CONF_RUNTIME_MODE, DEFAULT_RUNTIME_MODE)
-        if runtime_mode not in (
-            RUNTIME_MODE_AUTO_SP,
-            RUNTIME_MODE_MANUAL_SP,
-            RUNTIME_MODE_HOLD,
-            RUNTIME_MODE_MANUAL_OUT,
-        ):
+        if runtime_mode not in _RUNTIME_MODES:
             return DEFAULT_RUNTIME_MODE
         return runtime_mode
 
     def get_manual_out_value(self) -> float:
         return self._manual_out_value
 
+    def _manual_out_display_value(self) -> float:
+        """Return the value shown for manual OUT: the last auto output if known."""
+        last_auto = self._last_auto_out_value
+        return last_auto if last_auto is not None else self._manual_out_value
+
     def get_manual_sp_value(self) -> float | None:
         return self._manual_sp_value
 
@@ -789,6 +825,7 @@ class SolarEnergyFlowCoordinator(DataUpdateCoordinator[FlowState]):
         out_ent: str | None,
         desired_output: float | None,
         options: RuntimeOptions,
+        out_state=None,
     ) -> OutputWriteResult:
         if desired_output is None:
             return OutputWriteResult(output=self._last_output_raw, status="", write_failed=False)
@@ -798,7 +835,7 @@ class SolarEnergyFlowCoordinator(DataUpdateCoordinator[FlowState]):
 
         if out_ent:
             if should_write:
-                write_failed = not await _set_output(self.hass, out_ent, final_output)
+                write_failed = not await _set_output(self.hass, out_ent, final_output, out_state)
             # If we intentionally skipped writing, keep the previous output value.
         else:
             _LOGGER.warning("No output entity configured.")
@@ -832,20 +869,7 @@ class SolarEnergyFlowCoordinator(DataUpdateCoordinator[FlowState]):
         )
 
     def options_require_reload(self, old: Mapping[str, Any], new: Mapping[str, Any]) -> bool:
-        wiring_keys = {
-            CONF_PROCESS_VALUE_ENTITY,
-            CONF_SETPOINT_ENTITY,
-            CONF_OUTPUT_ENTITY,
-            CONF_GRID_POWER_ENTITY,
-            CONF_INVERT_PV,
-            CONF_INVERT_SP,
-            CONF_GRID_POWER_INVERT,
-        }
-
-        for key in wiring_keys:
-            if old.get(key) != new.get(key):
-                return True
-        return False
+        return any(old.get(key) != new.get(key) for key in _WIRING_KEYS)
     
     def apply_options(self, options: Mapping[str, Any]) -> None:
         """Apply runtime tuning without resetting PID state."""
@@ -910,7 +934,7 @@ class SolarEnergyFlowCoordinator(DataUpdateCoordinator[FlowState]):
             self._log_runtime_mode_change(prev_runtime_mode, runtime_mode, setpoint.manual_sp_value, manual_sp_display_value)
             # When not in MANUAL OUT mode, display the current output
             # When in MANUAL OUT mode, display the last auto OUT value
-            manual_out_display_value = safe_output if runtime_mode != RUNTIME_MODE_MANUAL_OUT else (self._last_auto_out_value if self._last_auto_out_value is not None else self._manual_out_value)
+            manual_out_display_value = safe_output if runtime_mode != RUNTIME_MODE_MANUAL_OUT else self._manual_out_display_value()
             return OutputPlan(
                 output=safe_output,
                 output_pre_rate_limit=safe_output,
@@ -934,7 +958,7 @@ class SolarEnergyFlowCoordinator(DataUpdateCoordinator[FlowState]):
             self._log_runtime_mode_change(prev_runtime_mode, runtime_mode, setpoint.manual_sp_value, manual_sp_display_value)
             # When not in MANUAL OUT mode, display the current output
             # When in MANUAL OUT mode, display the last auto OUT value
-            manual_out_display_value = held_output if runtime_mode != RUNTIME_MODE_MANUAL_OUT else (self._last_auto_out_value if self._last_auto_out_value is not None else self._manual_out_value)
+            manual_out_display_value = held_output if runtime_mode != RUNTIME_MODE_MANUAL_OUT else self._manual_out_display_value()
             return OutputPlan(
                 output=held_output,
                 output_pre_rate_limit=held_output,
@@ -963,7 +987,7 @@ class SolarEnergyFlowCoordinator(DataUpdateCoordinator[FlowState]):
             self._last_output_raw = manual_out_value
             self._last_output_pct = self._output_percent_from_raw(manual_out_value, options)
             # In MANUAL OUT mode, display the last auto OUT value that was active before switching
-            manual_out_display_value = self._last_auto_out_value if self._last_auto_out_value is not None else self._manual_out_value
+            manual_out_display_value = self._manual_out_display_value()
             return OutputPlan(
                 output=manual_out_value,
                 output_pre_rate_limit=manual_out_value,
@@ -988,7 +1012,7 @@ class SolarEnergyFlowCoordinator(DataUpdateCoordinator[FlowState]):
             self._log_runtime_mode_change(prev_runtime_mode, runtime_mode, setpoint.manual_sp_value, manual_sp_display_value)
             # When not in MANUAL OUT mode, display the current output (None in this case)
             # When in MANUAL OUT mode, display the last auto OUT value
-            manual_out_display_value = None if runtime_mode != RUNTIME_MODE_MANUAL_OUT else (self._last_auto_out_value if self._last_auto_out_value is not None else self._manual_out_value)
+            manual_out_display_value = None if runtime_mode != RUNTIME_MODE_MANUAL_OUT else self._manual_out_display_value()
             return OutputPlan(
                 output=None,
                 output_pre_rate_limit=None,
@@ -1046,8 +1070,10 @@ class SolarEnergyFlowCoordinator(DataUpdateCoordinator[FlowState]):
         elif prev_runtime_mode == RUNTIME_MODE_HOLD:
             current_output_pct = self._last_output_pct
 
+        # One timestamp per tick, shared by bumpless transfer and the PID step
+        now = time.monotonic()
         if bumpless_needed and current_output_pct is not None:
-            self.pid.bumpless_transfer(current_output=current_output_pct, error=error_pct, pv=pv_for_pid)
+            self.pid.bumpless_transfer(current_output=current_output_pct, error=error_pct, pv=pv_for_pid, now=now)
 
         self._limiter_state = limiter_result.limiter_state
 
@@ -1057,6 +1083,7 @@ class SolarEnergyFlowCoordinator(DataUpdateCoordinator[FlowState]):
             last_output=self._last_output_pct,
             rate_limiter_enabled=options.rate_limiter_enabled,
             rate_limit=rate_limit_pct,
+            now=now,
         )
 
         output_raw = self._output_raw_from_percent(step_result.output, options)
@@ -1106,9 +1133,9 @@ class SolarEnergyFlowCoordinator(DataUpdateCoordinator[FlowState]):
         setpoint_context = self._compute_setpoint_context(options, inputs, prev_runtime_mode, prev_manual_sp_value)
         limiter_result = self._apply_grid_limiter(options, inputs, setpoint_context, prev_limiter_state)
 
-        out_ent = _get_entity_id(self.entry, CONF_OUTPUT_ENTITY)
+        out_ent = self._output_entity_id
         out_state = self.hass.states.get(out_ent) if out_ent else None
-        out_available = out_state is not None and out_state.state not in ("unavailable", "unknown")
+        out_available = _state_available(out_state)
         
         # Log Output availability changes
         if out_ent and not out_available:
@@ -1133,7 +1160,7 @@ class SolarEnergyFlowCoordinator(DataUpdateCoordinator[FlowState]):
             self._log_runtime_mode_change(prev_runtime_mode, setpoint_context.runtime_mode, prev_manual_sp_value, setpoint_context.manual_sp_display_value)
             # When not in MANUAL OUT mode, display the current output (None in this case)
             # When in MANUAL OUT mode, display the last auto OUT value
-            manual_out_display_value = None if setpoint_context.runtime_mode != RUNTIME_MODE_MANUAL_OUT else (self._last_auto_out_value if self._last_auto_out_value is not None else self._manual_out_value)
+            manual_out_display_value = None if setpoint_context.runtime_mode != RUNTIME_MODE_MANUAL_OUT else self._manual_out_display_value()
             return FlowState(
                 pv=limiter_result.pv_for_pid,
                 sp=limiter_result.sp_for_pid,
@@ -1165,7 +1192,7 @@ class SolarEnergyFlowCoordinator(DataUpdateCoordinator[FlowState]):
             prev_pv_for_pid,
         )
 
-        write_result = await self._maybe_write_output(out_ent, output_plan.output, options)
+        write_result = await self._maybe_write_output(out_ent, output_plan.output, options, out_state)
         final_status = self._apply_output_status(output_plan.status, write_result.write_failed)
 
         return FlowState(
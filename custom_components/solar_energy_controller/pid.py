@@ -1,14 +1,16 @@
 from __future__ import annotations
 
+from collections.abc import Callable
 from dataclasses import dataclass
 import logging
 import time
+from typing import NamedTuple
 
 
 _LOGGER = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class PIDConfig:
     kp: float
     ki: float
@@ -17,7 +19,7 @@ class PIDConfig:
     max_output: float
 
 
-@dataclass
+@dataclass(slots=True)
 class PIDStepResult:
     output: float
     error: float
@@ -27,22 +29,38 @@ class PIDStepResult:
     output_pre_rate_limit: float
 
 
+class PIDState(NamedTuple):
+    integral: float
+    prev_pv: float | None
+    prev_t: float | None
+    prev_error: float | None
+
+
 class PID:
     """PID controller with anti-windup and derivative on measurement."""
 
-    def __init__(self, cfg: PIDConfig, *, entry_id: str | None = None) -> None:
+    def __init__(
+        self,
+        cfg: PIDConfig,
+        *,
+        entry_id: str | None = None,
+        time_fn: Callable[[], float] = time.monotonic,
+    ) -> None:
         self.cfg = cfg
+        self._time_fn = time_fn
         self._integral = 0.0
         self._prev_pv: float | None = None
         self._prev_t: float | None = None
         self._prev_error: float | None = None
         self._kaw = self._compute_kaw(cfg.kp)
+        self._max_integral = self._compute_max_integral(cfg)
         if entry_id:
             _LOGGER.debug("PIDController created entry_id=%s", entry_id)
 
     def update_config(self, cfg: PIDConfig) -> None:
         self.cfg = cfg
         self._kaw = self._compute_kaw(cfg.kp)
+        self._max_integral = self._compute_max_integral(cfg)
 
     def reset(self) -> None:
         self._integral = 0.0
@@ -54,20 +72,31 @@ class PID:
         """Apply new tuning without resetting accumulated state."""
         self.update_config(cfg)
 
+    def state(self) -> PIDState:
+        """Return a snapshot of the controller's internal state."""
+        return PIDState(self._integral, self._prev_pv, self._prev_t, self._prev_error)
+
     def _compute_kaw(self, kp: float) -> float:
         return 1.0 / max(kp, 0.001)
 
+    @staticmethod
+    def _compute_max_integral(cfg: PIDConfig) -> float | None:
+        """Return the integral clamp (2x output range), or None when the range is empty."""
+        output_range = abs(cfg.max_output - cfg.min_output)
+        return output_range * 2.0 if output_range > 0 else None
+
     def step(
         self,
         pv: float,
         error: float,
         last_output: float | None,
-        *,
         rate_limiter_enabled: bool,
         rate_limit: float,
+        now: float | None = None,
     ) -> PIDStepResult:
         """Return the latest PID step details."""
-        now = time.monotonic()
+        if now is None:
+            now = self._time_fn()
         if self._prev_t is None:
             dt = 0.0
         else:
@@ -78,37 +107,38 @@ class PID:
         else:
             d_pv = (pv - self._prev_pv) / dt
 
-        p = self.cfg.kp * error
+        cfg = self.cfg
+        min_output = cfg.min_output
+        max_output = cfg.max_output
+
+        p = cfg.kp * error
         i = self._integral
-        d = -self.cfg.kd * d_pv
+        d = -cfg.kd * d_pv
 
         u_pid = p + i + d
-        u_sat = max(self.cfg.min_output, min(self.cfg.max_output, u_pid))
+        u_sat = max(min_output, min(max_output, u_pid))
 
-        if rate_limiter_enabled and rate_limit > 0 and last_output is not None and dt > 0:
+        rate_limit_active = rate_limiter_enabled and rate_limit > 0 and last_output is not None
+        if rate_limit_active and dt > 0:
             max_delta = rate_limit * dt
             u_out = max(last_output - max_delta, min(last_output + max_delta, u_sat))
         else:
             u_out = u_sat
 
         if dt > 0:
-            output_saturated = (u_pid < self.cfg.min_output) or (u_pid > self.cfg.max_output)
-            rate_limited = rate_limiter_enabled and rate_limit > 0 and last_output is not None and u_out != u_sat
-            
-            if output_saturated or rate_limited:
+            # Conditional integration: freeze the integral while saturated or rate limited
+            if u_pid < min_output or u_pid > max_output or (rate_limit_active and u_out != u_sat):
                 integral_update = 0.0
             else:
-                integral_update = self.cfg.ki * error * dt + self._kaw * (u_out - u_pid) * dt
-            
-            output_range = abs(self.cfg.max_output - self.cfg.min_output)
-            if output_range > 0:
-                max_integral = output_range * 2.0
-                new_integral = self._integral + integral_update
-                self._integral = max(-max_integral, min(max_integral, new_integral))
-            else:
-                self._integral += integral_update
+                integral_update = cfg.ki * error * dt + self._kaw * (u_out - u_pid) * dt
+
+            new_integral = self._integral + integral_update
+            max_integral = self._max_integral
+            if max_integral is not None:
+                new_integral = max(-max_integral, min(max_integral, new_integral))
+            self._integral = new_integral
             # Update i_term to reflect the new integral value (for next step)
-            i = self._integral
+            i = new_integral
 
         self._prev_pv = pv
         self._prev_t = now
@@ -122,10 +152,17 @@ class PID:
             output_pre_rate_limit=u_sat,
         )
 
-    def bumpless_transfer(self, current_output: float, error: float, pv: float | None) -> None:
+    def bumpless_transfer(
+        self,
+        current_output: float,
+        error: float,
+        pv: float | None,
+        now: float | None = None,
+    ) -> None:
         """Adjust integral to avoid output jumps when mode/setpoint changes."""
 
-        now = time.monotonic()
+        if now is None:
+            now = self._time_fn()
         dt = 0.0 if self._prev_t is None else max(1e-6, now - self._prev_t)
 
         if pv is None or self._prev_pv is None or dt == 0.0:
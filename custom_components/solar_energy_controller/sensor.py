@@ -8,7 +8,25 @@ from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN
+from .const import (
+    CONF_KD,
+    CONF_KI,
+    CONF_KP,
+    CONF_MAX_OUTPUT,
+    CONF_MIN_OUTPUT,
+    CONF_PID_DEADBAND,
+    DEFAULT_KD,
+    DEFAULT_KI,
+    DEFAULT_KP,
+    DEFAULT_MAX_OUTPUT,
+    DEFAULT_MIN_OUTPUT,
+    DEFAULT_PID_DEADBAND,
+    DOMAIN,
+    RUNTIME_MODE_AUTO_SP,
+    RUNTIME_MODE_HOLD,
+    RUNTIME_MODE_MANUAL_OUT,
+    RUNTIME_MODE_MANUAL_SP,
+)
 from .coordinator import SolarEnergyFlowCoordinator
 
 type SolarEnergyControllerConfigEntry = ConfigEntry[SolarEnergyFlowCoordinator]
@@ -188,15 +206,6 @@ class SolarEnergyFlowStatusSensor(_BaseFlowSensor):
         # Get runtime options from coordinator
         options = self.coordinator._build_runtime_options()
         
-        # Get values from entry options
-        from .const import (
-            CONF_KP, CONF_KI, CONF_KD, CONF_MIN_OUTPUT, CONF_MAX_OUTPUT,
-            CONF_PID_DEADBAND,
-            DEFAULT_KP, DEFAULT_KI, DEFAULT_KD, DEFAULT_MIN_OUTPUT, DEFAULT_MAX_OUTPUT,
-            DEFAULT_PID_DEADBAND,
-            RUNTIME_MODE_AUTO_SP, RUNTIME_MODE_MANUAL_SP, RUNTIME_MODE_HOLD, RUNTIME_MODE_MANUAL_OUT,
-        )
-        
         return {
             "enabled": options.enabled,
             "runtime_mode": options.runtime_mode,
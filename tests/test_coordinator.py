@@ -33,7 +33,7 @@ from custom_components.solar_energy_controller.const import (
     RUNTIME_MODE_MANUAL_OUT,
     RUNTIME_MODE_MANUAL_SP,
 )
-from custom_components.solar_energy_controller.coordinator import SolarEnergyFlowCoordinator, OutputWriteResult
+from custom_components.solar_energy_controller.coordinator import SolarEnergyFlowCoordinator, OutputWriteResult, _coerce_float, _set_output
 from custom_components.solar_energy_controller.const import (
     CONF_PV_MIN,
     CONF_PV_MAX,
@@ -238,9 +238,11 @@ async def test_coordinator_read_inputs(mock_hass, mock_entry):
     assert inputs.pv == 50.0
     assert inputs.sp == 60.0
     assert inputs.grid_power == 100.0
+    # Each wired input entity is read exactly once
+    assert mock_hass.states.get.call_count == 3
 
 
-async def test_coordinator_read_inputs_unavailable(mock_hass, mock_entry):
+async def test_coordinator_read_inputs_unavailable(mock_hass, mock_entry, caplog):
     """Test coordinator _read_inputs with unavailable entities."""
     coordinator = SolarEnergyFlowCoordinator(mock_hass, mock_entry)
     
@@ -261,6 +263,8 @@ async def test_coordinator_read_inputs_unavailable(mock_hass, mock_entry):
     
     # PV should be None when unavailable
     assert inputs.pv is None
+    # Unavailable states are not parsed, so no conversion warning is logged
+    assert "Could not convert state" not in caplog.text
 
 
 async def test_coordinator_async_update_data(mock_hass, mock_entry):
@@ -300,7 +304,7 @@ async def test_coordinator_async_update_data(mock_hass, mock_entry):
         )
         
         # Mock output writing - need to actually set _last_output_raw
-        async def mock_write(ent, output, opts):
+        async def mock_write(ent, output, opts, out_state=None):
             coordinator._last_output_raw = output
             return MagicMock(write_failed=False, output=output)
         
@@ -398,6 +402,31 @@ async def test_coordinator_maybe_write_output_failed(mock_hass, mock_entry):
         assert result.write_failed is True
 
 
+async def test_set_output_reuses_given_state(mock_hass):
+    """Test that _set_output clamps with a pre-read state without reading it again."""
+    state = MockState("10.0", {"min": 0.0, "max": 50.0})
+
+    result = await _set_output(mock_hass, "number.output", 80.0, state)
+
+    assert result is True
+    mock_hass.states.get.assert_not_called()
+    mock_hass.services.async_call.assert_called_once_with(
+        "number", "set_value", {"entity_id": "number.output", "value": 50.0}, blocking=True
+    )
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [(1.5, 1.5), (3, 3.0), (True, 1.0), ("2.5", 2.5), ("unavailable", 7.0), (None, 7.0)],
+)
+def test_coerce_float(value, expected):
+    """Test _coerce_float for numeric, string and invalid input."""
+    result = _coerce_float(value, 7.0)
+
+    assert result == expected
+    assert type(result) is float
+
+
 def test_coordinator_build_runtime_options(mock_hass, mock_entry):
     """Test coordinator _build_runtime_options."""
     coordinator = SolarEnergyFlowCoordinator(mock_hass, mock_entry)
@@ -1367,7 +1396,7 @@ async def test_control_loop_stability_pv_changes(mock_hass, mock_entry):
     
     write_calls = []
 
-    async def mock_write(out_ent, desired_output, options):
+    async def mock_write(out_ent, desired_output, options, out_state=None):
         write_calls.append(desired_output)
         return OutputWriteResult(output=desired_output, status="", write_failed=False)
     
@@ -1414,7 +1443,7 @@ async def test_control_loop_stability_setpoint_changes(mock_hass, mock_entry):
     
     write_calls = []
 
-    async def mock_write(out_ent, desired_output, options):
+    async def mock_write(out_ent, desired_output, options, out_state=None):
         write_calls.append(desired_output)
         return OutputWriteResult(output=desired_output, status="", write_failed=False)
     
@@ -1463,7 +1492,7 @@ async def test_control_loop_pid_convergence(mock_hass, mock_entry):
     pv_value = 40.0
     sp_value = 60.0
     
-    async def mock_write(out_ent, desired_output, options):
+    async def mock_write(out_ent, desired_output, options, out_state=None):
         outputs.append(desired_output)
         return OutputWriteResult(output=desired_output, status="", write_failed=False)
     
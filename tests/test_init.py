@@ -1,18 +1,27 @@
 """Test the __init__ module."""
 from __future__ import annotations
 
+import json
+from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from homeassistant.config_entries import ConfigEntry, ConfigEntryError, ConfigEntryNotReady
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CoreState, HomeAssistant
 
-from custom_components.solar_energy_controller import DOMAIN, async_setup, async_setup_entry, async_unload_entry
+from custom_components.solar_energy_controller import (
+    DOMAIN,
+    _update_listener,
+    async_setup,
+    async_setup_entry,
+    async_unload_entry,
+)
 from custom_components.solar_energy_controller.const import (
     CONF_GRID_POWER_ENTITY,
     CONF_OUTPUT_ENTITY,
     CONF_PROCESS_VALUE_ENTITY,
     CONF_SETPOINT_ENTITY,
+    VERSION,
 )
 
 
@@ -20,9 +29,11 @@ from custom_components.solar_energy_controller.const import (
 def mock_hass():
     """Create a mock Home Assistant instance."""
     hass = MagicMock(spec=HomeAssistant)
+    hass.state = CoreState.not_running
     hass.states = MagicMock()
     hass.http = MagicMock()
     hass.http.async_register_static_paths = AsyncMock()
+    hass.async_add_executor_job = AsyncMock(side_effect=lambda func, *args: func(*args))
     hass.bus = MagicMock()
     hass.bus.async_listen_once = MagicMock()
     hass.config_entries = MagicMock()
@@ -172,6 +183,8 @@ async def test_async_setup_frontend_path_registration(mock_hass):
         path_config = path_configs[0]
         assert path_config.url_path == f"/{DOMAIN}/frontend"
         assert path_config.cache_headers is False
+        # The deprecated blocking registration must never be used
+        mock_hass.http.register_static_path.assert_not_called()
 
 
 async def test_async_setup_frontend_path_missing(mock_hass):
@@ -185,3 +198,110 @@ async def test_async_setup_frontend_path_missing(mock_hass):
         # But should still set up event listener
         mock_hass.bus.async_listen_once.assert_called_once()
 
+
+async def test_async_setup_filesystem_checks_use_executor(mock_hass):
+    """Test that the frontend directory check runs in the executor."""
+    with patch("os.path.isdir", return_value=True) as mock_isdir:
+        result = await async_setup(mock_hass, {})
+
+        assert result is True
+        executor_funcs = [call.args[0] for call in mock_hass.async_add_executor_job.call_args_list]
+        assert mock_isdir in executor_funcs
+
+
+def test_version_matches_manifest():
+    """Test that the VERSION constant is kept in sync with manifest.json."""
+    manifest_path = (
+        Path(__file__).parent.parent / "custom_components" / DOMAIN / "manifest.json"
+    )
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+
+    assert VERSION == manifest["version"]
+
+
+async def test_register_resources_skips_existing(mock_hass):
+    """Test that only Lovelace resources not already present are created."""
+    resources_api = MagicMock()
+    resources_api.async_items = MagicMock(
+        return_value=[{"url": f"/{DOMAIN}/frontend/pid-controller-mini.js?v=0.0.1"}]
+    )
+    resources_api.async_create_item = AsyncMock()
+    mock_hass.lovelace = MagicMock(mode="storage", resources=resources_api)
+
+    with patch("os.path.isdir", return_value=True):
+        await async_setup(mock_hass, {})
+
+    register_resources = mock_hass.bus.async_listen_once.call_args[0][1]
+    with patch("asyncio.sleep", new_callable=AsyncMock):
+        await register_resources(None)
+
+    resources_api.async_create_item.assert_called_once()
+    created = resources_api.async_create_item.call_args[0][0]
+    assert created["url"].startswith(f"/{DOMAIN}/frontend/pid-controller-popup.js?v=")
+    assert created["res_type"] == "module"
+
+
+async def test_update_listener_skips_unchanged_options(mock_hass, mock_entry):
+    """Test that the update listener does nothing when options are unchanged."""
+    coordinator = MagicMock()
+    coordinator.options_cache = {"kp": 1.0}
+    coordinator.async_request_refresh = AsyncMock()
+    mock_entry.options = {"kp": 1.0}
+    mock_entry.runtime_data = coordinator
+
+    await _update_listener(mock_hass, mock_entry)
+
+    coordinator.apply_options.assert_not_called()
+    coordinator.async_request_refresh.assert_not_called()
+
+
+async def test_update_listener_applies_changed_options(mock_hass, mock_entry):
+    """Test that the update listener applies changed tuning options."""
+    coordinator = MagicMock()
+    coordinator.options_cache = {"kp": 1.0}
+    coordinator.options_require_reload = MagicMock(return_value=False)
+    coordinator.async_request_refresh = AsyncMock()
+    mock_entry.options = {"kp": 2.0}
+    mock_entry.runtime_data = coordinator
+
+    await _update_listener(mock_hass, mock_entry)
+
+    assert coordinator.options_cache == {"kp": 2.0}
+    assert coordinator.options_cache is not mock_entry.options
+    coordinator.apply_options.assert_called_once_with({"kp": 2.0})
+    coordinator.async_request_refresh.assert_called_once()
+
+
+async def test_async_setup_registers_resources_when_already_started(mock_hass):
+    """Test that resources are scheduled immediately if Home Assistant already started."""
+    mock_hass.state = CoreState.running
+    mock_hass.async_create_task = MagicMock(side_effect=lambda coro: coro.close())
+
+    with patch("os.path.isdir", return_value=True):
+        result = await async_setup(mock_hass, {})
+
+    assert result is True
+    mock_hass.async_create_task.assert_called_once()
+    mock_hass.bus.async_listen_once.assert_not_called()
+
+
+async def test_register_resources_all_present(mock_hass):
+    """Test that nothing is created when every card is already registered."""
+    resources_api = MagicMock()
+    resources_api.async_items = MagicMock(
+        return_value=[
+            {"url": f"/{DOMAIN}/frontend/pid-controller-mini.js?v=0.0.1"},
+            {"url": f"/{DOMAIN}/frontend/pid-controller-popup.js"},
+        ]
+    )
+    resources_api.async_create_item = AsyncMock()
+    mock_hass.lovelace = MagicMock(mode="storage", resources=resources_api)
+
+    with patch("os.path.isdir", return_value=True):
+        await async_setup(mock_hass, {})
+
+    register_resources = mock_hass.bus.async_listen_once.call_args[0][1]
+    with patch("asyncio.sleep", new_callable=AsyncMock):
+        await register_resources(None)
+
+    resources_api.async_create_item.assert_not_called()
@@ -1,157 +1,197 @@
 """Test the PID controller."""
 from __future__ import annotations
 
-import time
+from dataclasses import FrozenInstanceError
 
 import pytest
 
-from custom_components.solar_energy_controller.pid import PID, PIDConfig, PIDStepResult
+from custom_components.solar_energy_controller.pid import PID, PIDConfig, PIDState, PIDStepResult
 
 
-def test_pid_initialization():
+class FakeClock:
+    """Manually advanced monotonic clock for deterministic PID timing."""
+
+    def __init__(self) -> None:
+        self.t = 0.0
+
+    def __call__(self) -> float:
+        return self.t
+
+    def advance(self, dt: float) -> None:
+        self.t += dt
+
+
+_DEFAULT_CFG = PIDConfig(kp=1.0, ki=0.1, kd=0.0, min_output=0.0, max_output=100.0)
+
+
+@pytest.fixture(scope="module")
+def default_cfg() -> PIDConfig:
+    """Return the PI configuration shared by most tests."""
+    return _DEFAULT_CFG
+
+
+@pytest.fixture(scope="session")
+def clock() -> FakeClock:
+    """Return the fake clock shared by the whole run."""
+    return FakeClock()
+
+
+@pytest.fixture(autouse=True)
+def _reset_clock(clock: FakeClock) -> None:
+    """Rewind the shared clock before each test."""
+    clock.t = 0.0
+
+
+def test_pid_initialization(default_cfg):
     """Test PID controller initialization."""
-    cfg = PIDConfig(kp=1.0, ki=0.1, kd=0.0, min_output=0.0, max_output=100.0)
-    pid = PID(cfg, entry_id="test_entry")
+    pid = PID(default_cfg, entry_id="test_entry")
     
-    assert pid.cfg == cfg
-    assert pid._integral == 0.0
-    assert pid._prev_pv is None
-    assert pid._prev_t is None
-    assert pid._prev_error is None
+    assert pid.cfg == default_cfg
+    assert pid.state() == PIDState(integral=0.0, prev_pv=None, prev_t=None, prev_error=None)
 
 
-def test_pid_reset():
+def test_pid_reset(default_cfg):
     """Test PID reset."""
-    cfg = PIDConfig(kp=1.0, ki=0.1, kd=0.0, min_output=0.0, max_output=100.0)
-    pid = PID(cfg)
+    pid = PID(default_cfg)
     
     # Run a step to accumulate state
-    pid.step(pv=50.0, error=10.0, last_output=None, rate_limiter_enabled=False, rate_limit=0.0)
+    pid.step(50.0, 10.0, None, False, 0.0)
     
     # Reset
     pid.reset()
     
-    assert pid._integral == 0.0
-    assert pid._prev_pv is None
-    assert pid._prev_t is None
-    assert pid._prev_error is None
+    assert pid.state() == PIDState(integral=0.0, prev_pv=None, prev_t=None, prev_error=None)
 
 
-def test_pid_step_basic():
-    """Test basic PID step calculation."""
-    cfg = PIDConfig(kp=1.0, ki=0.1, kd=0.0, min_output=0.0, max_output=100.0)
-    pid = PID(cfg)
-    
-    # First step
-    result = pid.step(pv=50.0, error=10.0, last_output=None, rate_limiter_enabled=False, rate_limit=0.0)
-    
-    assert isinstance(result, PIDStepResult)
-    assert result.error == 10.0
-    assert result.p_term == 10.0  # kp * error
-    assert result.d_term == 0.0  # kd = 0
-    assert 0.0 <= result.output <= 100.0
-
-
-def test_pid_step_with_integral():
-    """Test PID step with integral term."""
-    cfg = PIDConfig(kp=1.0, ki=0.1, kd=0.0, min_output=0.0, max_output=100.0)
-    pid = PID(cfg)
-    
-    # First step
-    result1 = pid.step(pv=50.0, error=10.0, last_output=None, rate_limiter_enabled=False, rate_limit=0.0)
-    
-    # Small delay
-    time.sleep(0.01)
-    
-    # Second step - integral should accumulate
-    result2 = pid.step(pv=50.0, error=10.0, last_output=result1.output, rate_limiter_enabled=False, rate_limit=0.0)
-    
-    assert result2.i_term > result1.i_term  # Integral should increase
-
-
-def test_pid_step_with_derivative():
-    """Test PID step with derivative term."""
-    cfg = PIDConfig(kp=1.0, ki=0.0, kd=1.0, min_output=0.0, max_output=100.0)
-    pid = PID(cfg)
-    
-    # First step
-    result1 = pid.step(pv=50.0, error=10.0, last_output=None, rate_limiter_enabled=False, rate_limit=0.0)
-    
-    time.sleep(0.01)
-    
-    # Second step with changing PV
-    result2 = pid.step(pv=60.0, error=10.0, last_output=result1.output, rate_limiter_enabled=False, rate_limit=0.0)
-    
-    assert result2.d_term != 0.0  # Derivative should be non-zero
+# Each case: config and steps as (clock advance, pv, error, expected), where
+# expected maps PIDStepResult fields to their values after that step. The
+# rate limiter is off and each step feeds the previous output back in as
+# last_output.
+_STEP_CASES = {
+    "basic": (
+        _DEFAULT_CFG,
+        [
+            # p = kp * error; no I or D on the first step
+            (
+                0.0,
+                50.0,
+                10.0,
+                {
+                    "output": 10.0,
+                    "error": 10.0,
+                    "p_term": 10.0,
+                    "i_term": 0.0,
+                    "d_term": 0.0,
+                    "output_pre_rate_limit": 10.0,
+                },
+            ),
+        ],
+    ),
+    "integral": (
+        _DEFAULT_CFG,
+        [
+            (0.0, 50.0, 10.0, {"i_term": 0.0}),
+            # i = ki * error * dt
+            (0.01, 50.0, 10.0, {"i_term": 0.1 * 10.0 * 0.01}),
+        ],
+    ),
+    "derivative": (
+        PIDConfig(kp=1.0, ki=0.0, kd=1.0, min_output=0.0, max_output=100.0),
+        [
+            (0.0, 50.0, 10.0, {"d_term": 0.0}),
+            # Derivative on measurement: d = -kd * (pv change) / dt
+            (0.01, 60.0, 10.0, {"d_term": -1.0 * 10.0 / 0.01}),
+        ],
+    ),
+    "saturation": (
+        PIDConfig(kp=10.0, ki=1.0, kd=0.0, min_output=0.0, max_output=100.0),
+        [
+            # p = 500 is clamped to max_output
+            (0.0, 0.0, 50.0, {"p_term": 500.0, "output": 100.0, "output_pre_rate_limit": 100.0}),
+        ],
+    ),
+    "saturation_low": (
+        PIDConfig(kp=10.0, ki=1.0, kd=0.0, min_output=0.0, max_output=100.0),
+        [
+            # p = -500 is clamped to min_output
+            (0.0, 0.0, -50.0, {"p_term": -500.0, "output": 0.0, "output_pre_rate_limit": 0.0}),
+        ],
+    ),
+    "windup_prevention": (
+        PIDConfig(kp=1.0, ki=1.0, kd=0.0, min_output=0.0, max_output=100.0),
+        [
+            (0.0, 0.0, 200.0, {"output": 100.0, "i_term": 0.0}),
+            # The integral does not accumulate while the output is saturated
+            (0.01, 0.0, 200.0, {"output": 100.0, "i_term": 0.0}),
+        ],
+    ),
+}
 
 
-def test_pid_output_saturation():
-    """Test PID output saturation."""
-    cfg = PIDConfig(kp=10.0, ki=1.0, kd=0.0, min_output=0.0, max_output=100.0)
-    pid = PID(cfg)
-    
-    # Large error should saturate
-    result = pid.step(pv=0.0, error=50.0, last_output=None, rate_limiter_enabled=False, rate_limit=0.0)
-    
-    assert result.output == 100.0  # Should be clamped to max
+@pytest.mark.parametrize(("cfg", "steps"), list(_STEP_CASES.values()), ids=list(_STEP_CASES))
+def test_pid_step(cfg, steps, clock):
+    """Test PID step results against expected term values."""
+    pid = PID(cfg, time_fn=clock)
+    last_output = None
+    for advance, pv, error, expected in steps:
+        clock.advance(advance)
+        result = pid.step(pv, error, last_output, False, 0.0)
+        assert isinstance(result, PIDStepResult)
+        actual = {field: getattr(result, field) for field in expected}
+        assert actual == pytest.approx(expected)
+        last_output = result.output
 
 
-def test_pid_rate_limiting():
-    """Test PID rate limiting."""
+def test_pid_rate_limit_trajectory(clock):
+    """Test that the rate limiter ramps the output by rate_limit * dt per step."""
     cfg = PIDConfig(kp=10.0, ki=0.0, kd=0.0, min_output=0.0, max_output=100.0)
-    pid = PID(cfg)
-    
-    # First step
-    result1 = pid.step(pv=0.0, error=10.0, last_output=0.0, rate_limiter_enabled=True, rate_limit=10.0)
-    
-    time.sleep(0.1)
-    
-    # Second step with rate limiting
-    result2 = pid.step(pv=0.0, error=10.0, last_output=result1.output, rate_limiter_enabled=True, rate_limit=10.0)
-    
-    # Output change should be limited
-    max_change = 10.0 * 0.1  # rate_limit * dt
-    assert abs(result2.output - result1.output) <= max_change + 0.1  # Allow small tolerance
+    pid = PID(cfg, time_fn=clock)
+    rate_limit = 10.0
+    dt = 0.01
+    steps = 64
 
+    # Prime the timestamp; the first step has dt = 0 and is never rate limited
+    pid.step(0.0, 10.0, 0.0, True, rate_limit)
 
-def test_pid_integral_windup_prevention():
-    """Test that integral doesn't accumulate when output is saturated."""
-    cfg = PIDConfig(kp=1.0, ki=1.0, kd=0.0, min_output=0.0, max_output=100.0)
-    pid = PID(cfg)
-    
-    # First step - should saturate
-    result1 = pid.step(pv=0.0, error=200.0, last_output=None, rate_limiter_enabled=False, rate_limit=0.0)
-    integral1 = pid._integral
-    
-    time.sleep(0.01)
-    
-    # Second step - still saturated, integral should not accumulate
-    result2 = pid.step(pv=0.0, error=200.0, last_output=result1.output, rate_limiter_enabled=False, rate_limit=0.0)
-    integral2 = pid._integral
-    
-    # Integral should not increase when saturated
-    assert integral2 == integral1
+    last_output = 0.0
+    actual = []
+    for _ in range(steps):
+        clock.advance(dt)
+        last_output = pid.step(0.0, 10.0, last_output, True, rate_limit).output
+        actual.append(last_output)
+
+    # The unlimited output saturates at 100; the ramp reaches 6.4 after 64 steps
+    expected = [min(cfg.max_output, rate_limit * dt * n) for n in range(1, steps + 1)]
+    assert actual == pytest.approx(expected)
 
 
-def test_pid_integral_clamping():
+def test_pid_integral_clamping(clock):
     """Test that integral is clamped to reasonable values."""
     cfg = PIDConfig(kp=1.0, ki=100.0, kd=0.0, min_output=0.0, max_output=100.0)
-    pid = PID(cfg)
+    pid = PID(cfg, time_fn=clock)
     
-    # Run many steps with error
-    for _ in range(100):
-        time.sleep(0.001)
-        pid.step(pv=0.0, error=10.0, last_output=None, rate_limiter_enabled=False, rate_limit=0.0)
+    # The first step only records the timestamp; one long step then drives
+    # ki * error * dt far past the clamp
+    pid.step(0.0, 10.0, None, False, 0.0)
+    clock.advance(10.0)
+    pid.step(0.0, 10.0, None, False, 0.0)
     
     # Integral should be clamped to 2x output range
     max_integral = 2.0 * (cfg.max_output - cfg.min_output)
-    assert abs(pid._integral) <= max_integral
+    assert pid.state().integral == max_integral
+
+
+def test_pid_config_is_frozen(default_cfg):
+    """Test that PIDConfig is immutable and hashable, so instances can be shared."""
+    with pytest.raises(FrozenInstanceError):
+        default_cfg.kp = 2.0
 
+    assert hash(default_cfg) == hash(PIDConfig(kp=1.0, ki=0.1, kd=0.0, min_output=0.0, max_output=100.0))
 
-def test_pid_update_config():
+
+def test_pid_update_config(default_cfg):
     """Test updating PID configuration."""
-    cfg1 = PIDConfig(kp=1.0, ki=0.1, kd=0.0, min_output=0.0, max_output=100.0)
-    pid = PID(cfg1)
+    pid = PID(default_cfg)
     
     cfg2 = PIDConfig(kp=2.0, ki=0.2, kd=0.1, min_output=0.0, max_output=100.0)
     pid.update_config(cfg2)
@@ -159,38 +199,36 @@ def test_pid_update_config():
     assert pid.cfg == cfg2
 
 
-def test_pid_apply_options():
+def test_pid_apply_options(default_cfg):
     """Test applying options without reset."""
-    cfg1 = PIDConfig(kp=1.0, ki=0.1, kd=0.0, min_output=0.0, max_output=100.0)
-    pid = PID(cfg1)
+    pid = PID(default_cfg)
     
     # Accumulate some state
-    pid.step(pv=50.0, error=10.0, last_output=None, rate_limiter_enabled=False, rate_limit=0.0)
-    integral_before = pid._integral
+    pid.step(50.0, 10.0, None, False, 0.0)
+    integral_before = pid.state().integral
     
     # Apply new options
     cfg2 = PIDConfig(kp=2.0, ki=0.2, kd=0.1, min_output=0.0, max_output=100.0)
     pid.apply_options(cfg2)
     
     # State should be preserved
-    assert pid._integral == integral_before
+    assert pid.state().integral == integral_before
     assert pid.cfg == cfg2
 
 
-def test_pid_bumpless_transfer():
+def test_pid_bumpless_transfer(default_cfg):
     """Test bumpless transfer."""
-    cfg = PIDConfig(kp=1.0, ki=0.1, kd=0.0, min_output=0.0, max_output=100.0)
-    pid = PID(cfg)
+    pid = PID(default_cfg)
     
     # Set up some state
-    pid.step(pv=50.0, error=10.0, last_output=None, rate_limiter_enabled=False, rate_limit=0.0)
+    pid.step(50.0, 10.0, None, False, 0.0)
     
     # Bumpless transfer
     pid.bumpless_transfer(current_output=50.0, error=5.0, pv=55.0)
     
     # Integral should be adjusted
-    assert pid._prev_pv == 55.0
-    assert pid._prev_error == 5.0
+    state = pid.state()
+    assert (state.prev_pv, state.prev_error) == (55.0, 5.0)
 
 
 def test_pid_bumpless_transfer_no_ki():
@@ -201,5 +239,20 @@ def test_pid_bumpless_transfer_no_ki():
     pid.bumpless_transfer(current_output=50.0, error=5.0, pv=55.0)
     
     # Integral should be zero when Ki is zero
-    assert pid._integral == 0.0
+    assert pid.state().integral == 0.0
+
+
+def test_pid_step_uses_given_timestamp(default_cfg):
+    """Test that step and bumpless transfer use the caller's timestamp."""
+    pid = PID(default_cfg)
+
+    pid.step(50.0, 10.0, None, False, 0.0, now=100.0)
+    assert pid.state().prev_t == 100.0
+
+    pid.step(50.0, 10.0, None, False, 0.0, now=102.0)
+    assert pid.state().prev_t == 102.0
+    # dt comes from the supplied timestamps: ki * error * dt = 0.1 * 10 * 2
+    assert pid.state().integral == pytest.approx(2.0)
 
+    pid.bumpless_transfer(current_output=50.0, error=5.0, pv=55.0, now=103.0)
+    assert pid.state().prev_t == 103.0